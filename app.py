@@ -1,5 +1,7 @@
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import pandas as pd
 from data_processing import load_and_prepare_data
 
@@ -14,10 +16,103 @@ st.set_page_config(
 # Use a cache to avoid reloading data on every interaction
 @st.cache_data
 def load_data():
-    df = load_and_prepare_data()
-    # Ensure the timestamp column is timezone-naive for slider compatibility
-    df['order_purchase_timestamp'] = df['order_purchase_timestamp'].dt.tz_localize(None)
-    return df
+    # Timestamps are parsed timezone-naive (the Olist data has no offsets),
+    # so they work with the slider as loaded
+    return load_and_prepare_data()
+
+# Pre-aggregate orders once at the finest granularity the filters and visuals
+# need, so each interaction only rolls up this small table instead of the
+# full order-level frame. It is a cache_resource so every caller shares one
+# read-only frame instead of unpickling a fresh copy on each call.
+@st.cache_resource
+def load_daily_summary():
+    df = load_data()
+    order_date = df['order_purchase_timestamp'].dt.normalize().rename('Order Date')
+    # Prices are stored as float32; sum them as float64 rounded back to cents,
+    # so the revenue KPI stays exact when summed over the whole range
+    summary_df = df.assign(
+        is_late=(df['Delivery Status'].values == 'Late'),
+        price=df['price'].astype('float64').round(2),
+        freight_value=df['freight_value'].astype('float64').round(2)
+    ).groupby(
+        [order_date, 'Month', 'customer_state', 'product_category_name', 'Delivery Status'],
+        observed=True
+    ).agg(
+        total_orders=('order_id', 'count'),
+        late_orders=('is_late', 'sum'),
+        review_score_sum=('Review Score', 'sum'),
+        revenue=('price', 'sum'),
+        freight=('freight_value', 'sum')
+    ).reset_index()
+    return summary_df
+
+# --- Filtered Aggregates ---
+# The KPIs and roll-ups are cached per filter state, keyed by the date range
+# and a sorted tuple of the selected categories, so revisiting a slider
+# position or selection reuses the earlier results. The filtered summary
+# itself is not cached: it is cheap to slice and large to store per state.
+# max_entries bounds how many filter states are kept.
+def filter_summary(start_date, end_date, categories):
+    summary_df = load_daily_summary()
+    # Filters apply to the daily summary, so the date range covers whole days.
+    # The summary is sorted by 'Order Date', so the range is a binary-searched
+    # slice and only the category filter needs a boolean mask.
+    order_dates = summary_df['Order Date']
+    lo = order_dates.searchsorted(pd.to_datetime(start_date).normalize(), side='left')
+    hi = order_dates.searchsorted(pd.to_datetime(end_date), side='right')
+    date_slice = summary_df.iloc[lo:hi]
+    # The default state selects every category, where the isin would be a no-op
+    if set(categories) == set(summary_df['product_category_name'].cat.categories):
+        return date_slice
+    return date_slice[date_slice['product_category_name'].isin(categories)]
+
+@st.cache_data(max_entries=64)
+def compute_kpis(start_date, end_date, categories):
+    filtered_df = filter_summary(start_date, end_date, categories)
+    # One numpy reduction per summary column, with the order count reused
+    # as the denominator of both averages
+    total_orders = int(filtered_df['total_orders'].to_numpy().sum())
+    if total_orders == 0:
+        return 0, 0.0, 0.0, 0.0
+    avg_review_score = filtered_df['review_score_sum'].to_numpy().sum() / total_orders
+    late_delivery_rate = filtered_df['late_orders'].to_numpy().sum() / total_orders
+    total_revenue = filtered_df['revenue'].to_numpy().sum() + filtered_df['freight'].to_numpy().sum()
+    return total_orders, avg_review_score, late_delivery_rate, total_revenue
+
+@st.cache_data(max_entries=64)
+def agg_by_status(start_date, end_date, categories):
+    filtered_df = filter_summary(start_date, end_date, categories)
+    status_df = filtered_df.groupby('Delivery Status', observed=True)[['review_score_sum', 'total_orders']].sum().reset_index()
+    status_df['Review Score'] = status_df['review_score_sum'] / status_df['total_orders']
+    return status_df
+
+@st.cache_data(max_entries=64)
+def agg_by_state(start_date, end_date, categories):
+    filtered_df = filter_summary(start_date, end_date, categories)
+    state_df = filtered_df.groupby('customer_state', observed=True)[['total_orders', 'late_orders']].sum().reset_index()
+    state_df['late_rate'] = state_df['late_orders'] / state_df['total_orders']
+    return state_df.sort_values('late_rate', ascending=False).head(15) # Top 15
+
+@st.cache_data(max_entries=64)
+def agg_by_category(start_date, end_date, categories):
+    filtered_df = filter_summary(start_date, end_date, categories)
+    category_df = filtered_df.groupby('product_category_name', observed=True).agg(
+        Total_Revenue=('revenue', 'sum'),
+        Review_Score_Sum=('review_score_sum', 'sum'),
+        Total_Orders=('total_orders', 'sum')
+    ).reset_index()
+    category_df['Avg_Review_Score'] = category_df['Review_Score_Sum'] / category_df['Total_Orders']
+    return category_df
+
+@st.cache_data(max_entries=64)
+def agg_by_month(start_date, end_date, categories):
+    filtered_df = filter_summary(start_date, end_date, categories)
+    monthly_trend = filtered_df.groupby('Month', observed=True).agg(
+        Total_Orders=('total_orders', 'sum'),
+        Late_Orders=('late_orders', 'sum')
+    ).reset_index()
+    monthly_trend['Late_Rate'] = monthly_trend['Late_Orders'] / monthly_trend['Total_Orders']
+    return monthly_trend
 
 df = load_data()
 
@@ -53,23 +148,18 @@ selected_categories = st.sidebar.multiselect(
 )
 
 # --- Filtering Data ---
-filtered_df = df[
-    (df['order_purchase_timestamp'] >= pd.to_datetime(start_date)) &
-    (df['order_purchase_timestamp'] <= pd.to_datetime(end_date)) &
-    (df['product_category_name'].isin(selected_categories))
-]
+# A sorted tuple makes the selection a hashable, order-independent cache key
+cats_tuple = tuple(sorted(selected_categories))
+
+# --- KPI Metrics ---
+total_orders, avg_review_score, late_delivery_rate, total_revenue = compute_kpis(
+    start_date, end_date, cats_tuple
+)
 
-if filtered_df.empty:
+if total_orders == 0:
     st.warning("No data available for the selected filters.")
     st.stop()
 
-# --- KPI Metrics ---
-total_orders = filtered_df.shape[0]
-avg_review_score = filtered_df['Review Score'].mean()
-late_deliveries = filtered_df[filtered_df['Delivery Status'] == 'Late'].shape[0]
-late_delivery_rate = (late_deliveries / total_orders) if total_orders > 0 else 0
-total_revenue = filtered_df['price'].sum() + filtered_df['freight_value'].sum()
-
 st.header("Executive KPI Summary")
 col1, col2, col3, col4 = st.columns(4)
 
@@ -94,7 +184,7 @@ left_col, right_col = st.columns(2)
 # Visual 1: Average Review Score by Delivery Status
 with left_col:
     st.subheader("Average Review Score by Delivery Status")
-    avg_score_by_status = filtered_df.groupby('Delivery Status')['Review Score'].mean().reset_index()
+    avg_score_by_status = agg_by_status(start_date, end_date, cats_tuple)
     fig1 = px.bar(
         avg_score_by_status,
         x='Delivery Status',
@@ -109,12 +199,7 @@ with left_col:
 # Visual 2: Late Delivery Rate by State (Using a bar chart for simplicity as maps can be slow)
 with left_col:
     st.subheader("Late Delivery Rate by State")
-    state_df = filtered_df.groupby('customer_state').agg(
-        total_orders=('order_id', 'count'),
-        late_orders=('Delivery Status', lambda x: (x == 'Late').sum())
-    ).reset_index()
-    state_df['late_rate'] = state_df['late_orders'] / state_df['total_orders']
-    state_df = state_df.sort_values('late_rate', ascending=False).head(15) # Top 15
+    state_df = agg_by_state(start_date, end_date, cats_tuple)
     fig2 = px.bar(
         state_df,
         x='late_rate',
@@ -130,11 +215,7 @@ with left_col:
 # Visual 3: Revenue vs. Satisfaction by Product Category
 with right_col:
     st.subheader("Revenue vs. Satisfaction by Product Category")
-    category_df = filtered_df.groupby('product_category_name').agg(
-        Total_Revenue=('price', 'sum'),
-        Avg_Review_Score=('Review Score', 'mean'),
-        Total_Orders=('order_id', 'count')
-    ).reset_index()
+    category_df = agg_by_category(start_date, end_date, cats_tuple)
     fig3 = px.scatter(
         category_df,
         x='Avg_Review_Score',
@@ -144,7 +225,8 @@ with right_col:
         hover_name='product_category_name',
         size_max=60,
         height=400,
-        labels={'Avg_Review_Score': 'Average Review Score', 'Total_Revenue': 'Total Revenue'}
+        labels={'Avg_Review_Score': 'Average Review Score', 'Total_Revenue': 'Total Revenue'},
+        render_mode='webgl'
     )
     fig3.update_layout(showlegend=False)
     st.plotly_chart(fig3, use_container_width=True)
@@ -152,31 +234,25 @@ with right_col:
 # Visual 4: Monthly Orders & Late Delivery Trend
 with right_col:
     st.subheader("Monthly Orders & Late Delivery Trend")
-    monthly_df = filtered_df.copy()
-    monthly_df['Month'] = monthly_df['order_purchase_timestamp'].dt.to_period('M').astype(str)
-    monthly_trend = monthly_df.groupby('Month').agg(
-        Total_Orders=('order_id', 'count'),
-        Late_Orders=('Delivery Status', lambda x: (x == 'Late').sum())
-    ).reset_index()
-    monthly_trend['Late_Rate'] = monthly_trend['Late_Orders'] / monthly_trend['Total_Orders']
+    monthly_trend = agg_by_month(start_date, end_date, cats_tuple)
 
-    # Create a dual-axis chart is tricky in Plotly Express, but we can overlay
-    from plotly.subplots import make_subplots
+    # Create a dual-axis chart is tricky in Plotly Express, so we build the
+    # traces directly with graph objects and overlay them
     fig4 = make_subplots(specs=[[{"secondary_y": True}]])
 
     # Add bars for Total Orders
     fig4.add_trace(
-        px.bar(monthly_trend, x='Month', y='Total_Orders').data[0],
+        go.Bar(x=monthly_trend['Month'], y=monthly_trend['Total_Orders'],
+               name='Total Orders', marker_color='#4682B4'),
         secondary_y=False,
     )
-    fig4.update_traces(marker_color='#4682B4', name='Total Orders')
 
     # Add line for Late Delivery Rate
     fig4.add_trace(
-        px.line(monthly_trend, x='Month', y='Late_Rate').data[0],
+        go.Scatter(x=monthly_trend['Month'], y=monthly_trend['Late_Rate'], mode='lines',
+                   name='Late Delivery Rate', line_color='#FF6347'),
         secondary_y=True,
     )
-    fig4.update_traces(marker_color='#FF6347', name='Late Delivery Rate')
 
     fig4.update_layout(height=400, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
     fig4.update_yaxes(title_text="Total Orders", secondary_y=False)
@@ -0,0 +1,39 @@
+"""
+Converts the Olist CSV files used by the dashboard to Parquet.
+
+The Olist dataset never changes, so this only needs to run once. Each CSV is
+written as a Parquet file with the same name next to the original, with the
+order date columns already parsed. `load_and_prepare_data` reads these copies
+instead of the CSVs whenever they exist.
+
+Usage (from the repository root):
+    python scripts/csv_to_parquet.py [data_path]
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing import DATE_FORMAT, ORDER_DATE_COLS, SOURCE_DATASETS
+
+
+def convert_csv_to_parquet(data_path='olsit data/'):
+    """
+    Writes a Parquet copy of every Olist source CSV in `data_path`.
+
+    Args:
+        data_path (str): The path to the directory containing the CSV files.
+    """
+    for name in SOURCE_DATASETS:
+        df = pd.read_csv(f'{data_path}{name}.csv')
+        for col in ORDER_DATE_COLS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors='coerce', cache=True)
+
+        df.to_parquet(f'{data_path}{name}.parquet', engine='pyarrow', compression='zstd', index=False)
+        print(f"Converted {name}.csv -> {name}.parquet")
+
+
+if __name__ == '__main__':
+    convert_csv_to_parquet(*sys.argv[1:])